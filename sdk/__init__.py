@@ -16,8 +16,13 @@ Quick Start:
 """
 
 from .kogaion import KogaionAgent, Agent, Task, Block
+from .kogaion_index import ChainIndex, AgentDirectory
+from .kogaion_profiling import KogaionProfiler
+from .kogaion_replay import TrafficRecorder, ReplayTransport, ReplayedRequestError
 
 __version__ = "1.0.0"
 __author__ = "ClawKogaionAgent"
 
-__all__ = ["KogaionAgent", "Agent", "Task", "Block"]
+__all__ = ["KogaionAgent", "Agent", "Task", "Block", "ChainIndex", "AgentDirectory",
+           "KogaionProfiler", "TrafficRecorder", "ReplayTransport",
+           "ReplayedRequestError"]
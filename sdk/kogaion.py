@@ -6,7 +6,9 @@ A Python SDK for AI agents to interact with the Kogaion blockchain.
 
 import asyncio
 import json
-from typing import List, Dict, Optional, Callable
+import time
+from contextlib import nullcontext
+from typing import Any, List, Dict, Optional, Callable
 from dataclasses import dataclass
 from aiohttp import ClientSession
 import websockets
@@ -47,11 +49,37 @@ class Block:
     validator_id: str
 
 
+def _agent_from_dict(a: Dict) -> Agent:
+    """Build an Agent from its API / P2P representation."""
+    return Agent(
+        id=a["id"],
+        name=a["name"],
+        reputation=a.get("reputation", 0),
+        credits=a.get("credits", 0),
+        capabilities=a.get("capabilities", []),
+        tasks_completed=a.get("tasksCompleted", 0),
+        cooperations_count=a.get("cooperationsCount", 0)
+    )
+
+
+def _block_from_dict(b: Dict) -> Block:
+    """Build a Block from its API / P2P representation."""
+    return Block(
+        index=b["index"],
+        timestamp=b["timestamp"],
+        transactions=b.get("transactions", []),
+        hash=b.get("hash", ""),
+        previous_hash=b.get("previousHash", ""),
+        validator_id=b.get("validatorId", "")
+    )
+
+
 class KogaionAgent:
     """Main SDK class for interacting with Kogaion blockchain."""
     
     def __init__(self, api_url: str = "http://localhost:3000", 
-                 p2p_url: str = "ws://localhost:4000"):
+                 p2p_url: str = "ws://localhost:4000",
+                 profiler=None, recorder=None, transport=None):
         self.api_url = api_url.rstrip('/')
         self.p2p_url = p2p_url.rstrip('/')
         self.session: Optional[ClientSession] = None
@@ -66,9 +94,18 @@ class KogaionAgent:
         
         # Event handlers
         self._handlers: Dict[str, List[Callable]] = {}
+        
+        # Optional KogaionProfiler (see kogaion_profiling)
+        self.profiler = profiler
+        
+        # Optional TrafficRecorder / ReplayTransport (see kogaion_replay)
+        self.recorder = recorder
+        self.transport = transport
     
     async def __aenter__(self):
         self.session = ClientSession()
+        if self.profiler:
+            self.profiler.start()
         return self
     
     async def __aexit__(self, *args):
@@ -76,16 +113,39 @@ class KogaionAgent:
         if self.session:
             await self.session.close()
     
+    def _measure(self, kind: str, name: str):
+        """Time a block with the profiler, if one is attached."""
+        if self.profiler:
+            return self.profiler.measure(kind, name)
+        return nullcontext()
+    
     # ============== HTTP HELPERS ==============
     
     async def _request(self, method: str, endpoint: str, **kwargs) -> Dict:
         """Make HTTP request to Kogaion API."""
-        if not self.session:
-            self.session = ClientSession()
-        
-        url = f"{self.api_url}{endpoint}"
-        async with self.session.request(method, url, **kwargs) as response:
-            return await response.json()
+        with self._measure("http", f"{method} {endpoint}"):
+            start = time.monotonic()
+            try:
+                if self.transport:
+                    data = await self.transport.request(method, endpoint, **kwargs)
+                else:
+                    if not self.session:
+                        self.session = ClientSession()
+                    
+                    url = f"{self.api_url}{endpoint}"
+                    async with self.session.request(method, url, **kwargs) as response:
+                        data = await response.json()
+            except Exception as e:
+                if self.recorder:
+                    self.recorder.record_http_error(method, endpoint, kwargs.get("json"), e,
+                                                    time.monotonic() - start)
+                raise
+            
+            # Replayed traffic is recorded too, so a replay can be re-recorded
+            if self.recorder:
+                self.recorder.record_http(method, endpoint, kwargs.get("json"), data,
+                                          time.monotonic() - start)
+            return data
     
     async def get(self, endpoint: str) -> Dict:
         return await self._request("GET", endpoint)
@@ -242,18 +302,7 @@ class KogaionAgent:
     async def discover_agents(self) -> List[Agent]:
         """Discover all agents on the network."""
         data = await self.get("/api/agents")
-        agents = []
-        for a in data:
-            agents.append(Agent(
-                id=a["id"],
-                name=a["name"],
-                reputation=a.get("reputation", 0),
-                credits=a.get("credits", 0),
-                capabilities=a.get("capabilities", []),
-                tasks_completed=a.get("tasksCompleted", 0),
-                cooperations_count=a.get("cooperationsCount", 0)
-            ))
-        return agents
+        return [_agent_from_dict(a) for a in data]
     
     async def find_agents_by_capability(self, capabilities: List[str]) -> List[Agent]:
         """Find agents with specific capabilities."""
@@ -270,21 +319,34 @@ class KogaionAgent:
         if self.ws:
             return
         
-        self.ws = await websockets.connect(self.p2p_url)
+        if self.transport:
+            self.ws = await self.transport.connect_p2p()
+        else:
+            self.ws = await websockets.connect(self.p2p_url)
+        if self.profiler:
+            self.profiler.start()
         self._emit("p2pConnected")
         
         # Start listening
-        asyncio.create_task(self._p2p_listener())
+        asyncio.create_task(self._p2p_listener(self.ws))
     
-    async def _p2p_listener(self):
-        """Listen for P2P messages."""
+    async def _p2p_listener(self, ws):
+        """Listen for P2P messages on one connection."""
         try:
-            async for message in self.ws:
-                data = json.loads(message)
-                await self._handle_p2p_message(data)
+            async for message in ws:
+                if self.recorder:
+                    self.recorder.record_p2p(message)
+                with self._measure("decode", "p2p"):
+                    data = json.loads(message)
+                with self._measure("p2p", str(data.get("type"))):
+                    await self._handle_p2p_message(data)
         except websockets.exceptions.ConnectionClosed:
-            self._emit("p2pDisconnected")
+            pass
+        
+        # After disconnect() or a reconnect, self.ws is no longer ours to clear
+        if self.ws is ws:
             self.ws = None
+            self._emit("p2pDisconnected")
     
     async def _handle_p2p_message(self, data: Dict):
         """Handle incoming P2P message."""
@@ -295,6 +357,7 @@ class KogaionAgent:
             "NEW_TASK": lambda: self._emit("newTask", data.get("task")),
             "NEW_AGENT": lambda: self._emit("newAgent", data.get("agent")),
             "TASK_COMPLETED": lambda: self._emit("taskCompleted", data),
+            "SYNC": lambda: self._emit("chainSync", data.get("chain")),
         }
         
         if handler := handlers.get(msg_type):
@@ -305,6 +368,8 @@ class KogaionAgent:
         if self.ws:
             await self.ws.close()
             self.ws = None
+        if self.profiler:
+            self.profiler.stop()
     
     # ============== BLOCKCHAIN ==============
     
@@ -315,17 +380,7 @@ class KogaionAgent:
     async def get_chain(self) -> List[Block]:
         """Get the full blockchain."""
         data = await self.get("/api/chain")
-        blocks = []
-        for b in data:
-            blocks.append(Block(
-                index=b["index"],
-                timestamp=b["timestamp"],
-                transactions=b.get("transactions", []),
-                hash=b["hash"],
-                previous_hash=b.get("previousHash", ""),
-                validator_id=b.get("validatorId", "")
-            ))
-        return blocks
+        return [_block_from_dict(b) for b in data]
     
     async def get_block(self, index: int) -> Optional[Block]:
         """Get block by height."""
@@ -333,14 +388,7 @@ class KogaionAgent:
         if "error" in data:
             return None
         
-        return Block(
-            index=data["index"],
-            timestamp=data["timestamp"],
-            transactions=data.get("transactions", []),
-            hash=data["hash"],
-            previous_hash=data.get("previousHash", ""),
-            validator_id=data.get("validatorId", "")
-        )
+        return _block_from_dict(data)
     
     async def mine_block(self) -> Optional[Dict]:
         """Mine pending transactions (requires 50+ reputation)."""
@@ -368,15 +416,32 @@ class KogaionAgent:
             self._handlers[event] = []
         self._handlers[event].append(handler)
     
-    def _emit(self, event: str, data: any = None):
+    def _emit(self, event: str, data: Any = None):
         """Emit event to handlers."""
         if event in self._handlers:
             for handler in self._handlers[event]:
                 if asyncio.iscoroutinefunction(handler):
-                    asyncio.create_task(handler(data))
+                    coro = handler(data)
+                    if self.profiler:
+                        coro = self._profile_async_handler(
+                            self._handler_name(event, handler), coro
+                        )
+                    asyncio.create_task(coro)
+                elif self.profiler:
+                    with self.profiler.measure("handler", self._handler_name(event, handler)):
+                        handler(data)
                 else:
                     handler(data)
     
+    @staticmethod
+    def _handler_name(event: str, handler: Callable) -> str:
+        return f"{event}:{getattr(handler, '__qualname__', repr(handler))}"
+    
+    async def _profile_async_handler(self, name: str, coro: Any):
+        """Await a coroutine handler, recording its wall time as latency."""
+        with self.profiler.measure("async_handler", name):
+            await coro
+    
     # ============== PROPERTIES ==============
     
     @property
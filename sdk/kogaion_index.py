@@ -0,0 +1,356 @@
+"""
+🗂️ Kogaion Query Indexes
+
+In-memory indexes over chain and agent data, built incrementally from
+P2P events.
+"""
+
+import asyncio
+import heapq
+import json
+import os
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .kogaion import Agent, Block, KogaionAgent, _agent_from_dict, _block_from_dict
+except ImportError:
+    # Flat layout: the sdk directory itself is on sys.path
+    from kogaion import Agent, Block, KogaionAgent, _agent_from_dict, _block_from_dict
+
+
+def _block_to_dict(block: Block) -> Dict:
+    """Inverse of _block_from_dict, using the API's field names."""
+    return {
+        "index": block.index,
+        "timestamp": block.timestamp,
+        "transactions": block.transactions,
+        "hash": block.hash,
+        "previousHash": block.previous_hash,
+        "validatorId": block.validator_id
+    }
+
+
+class _Postings:
+    """Timestamp-ordered references into the chain for one index key."""
+
+    def __init__(self):
+        self.timestamps: List[int] = []
+        self.refs: List[Tuple[int, int]] = []
+
+    def add(self, timestamp: int, ref: Tuple[int, int]):
+        # Blocks normally arrive in time order, making this an append
+        pos = bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(pos, timestamp)
+        self.refs.insert(pos, ref)
+
+    def range(self, since: Optional[int], until: Optional[int]) -> List[Tuple[int, int]]:
+        lo = 0 if since is None else bisect_left(self.timestamps, since)
+        hi = len(self.refs) if until is None else bisect_right(self.timestamps, until)
+        return self.refs[lo:hi]
+
+
+class ChainIndex:
+    """History index over chain data.
+
+    Keyed by validator id, by ``fromAgentId`` / ``toAgentId`` and by
+    transaction type, with ``since`` / ``until`` filters on block timestamps
+    (ms, inclusive). Lookups cost O(log n + results). Built incrementally
+    from blocks as they arrive; if ``path`` is given, blocks are appended
+    there as JSON lines and reloaded on construction.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.blocks: Dict[int, Block] = {}
+
+        self._by_validator: Dict[str, _Postings] = {}
+        self._by_agent: Dict[str, _Postings] = {}
+        self._by_type: Dict[str, _Postings] = {}
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._index(_block_from_dict(json.loads(line)))
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    # ============== BUILDING ==============
+
+    def add_block(self, block) -> bool:
+        """Index a Block (or its API dict). Returns False if already indexed."""
+        return self.add_blocks([block]) == 1
+
+    def add_blocks(self, blocks: List) -> int:
+        """Index several blocks, returning how many were new.
+
+        New blocks are persisted in a single append per call.
+        """
+        added = []
+        for block in blocks or []:
+            if isinstance(block, dict):
+                block = _block_from_dict(block)
+            if block.index in self.blocks:
+                continue
+            self._index(block)
+            added.append(block)
+
+        if added and self.path:
+            with open(self.path, "a") as f:
+                f.writelines(json.dumps(_block_to_dict(b)) + "\n" for b in added)
+        return len(added)
+
+    def _index(self, block: Block):
+        self.blocks[block.index] = block
+        ts = block.timestamp
+
+        self._postings(self._by_validator, block.validator_id).add(ts, (block.index, -1))
+
+        for i, tx in enumerate(block.transactions):
+            ref = (block.index, i)
+            if tx.get("type"):
+                self._postings(self._by_type, tx["type"]).add(ts, ref)
+            agents = {tx.get("fromAgentId"), tx.get("toAgentId")} - {None}
+            for agent_id in agents:
+                self._postings(self._by_agent, agent_id).add(ts, ref)
+
+    @staticmethod
+    def _postings(table: Dict[str, _Postings], key: str) -> _Postings:
+        if key not in table:
+            table[key] = _Postings()
+        return table[key]
+
+    def attach(self, agent: KogaionAgent):
+        """Keep the index current from an agent's P2P block events."""
+        agent.on("newBlock", self.add_block)
+        agent.on("chainSync", self.add_blocks)
+
+    async def sync(self, agent: KogaionAgent) -> int:
+        """Index any blocks from ``get_chain()`` not seen yet."""
+        return self.add_blocks(await agent.get_chain())
+
+    # ============== QUERIES ==============
+
+    def blocks_by_validator(self, validator_id: str, since: Optional[int] = None,
+                            until: Optional[int] = None) -> List[Block]:
+        """Get blocks produced by a validator."""
+        postings = self._by_validator.get(validator_id)
+        if not postings:
+            return []
+        return [self.blocks[index] for index, _ in postings.range(since, until)]
+
+    def transactions_for_agent(self, agent_id: str, since: Optional[int] = None,
+                               until: Optional[int] = None) -> List[Tuple[Block, Dict]]:
+        """Get (block, transaction) pairs where the agent is sender or receiver."""
+        return self._transactions(self._by_agent.get(agent_id), since, until)
+
+    def transactions_by_type(self, tx_type: str, since: Optional[int] = None,
+                             until: Optional[int] = None) -> List[Tuple[Block, Dict]]:
+        """Get (block, transaction) pairs of a given transaction type."""
+        return self._transactions(self._by_type.get(tx_type), since, until)
+
+    def _transactions(self, postings: Optional[_Postings], since: Optional[int],
+                      until: Optional[int]) -> List[Tuple[Block, Dict]]:
+        if not postings:
+            return []
+        return [
+            (self.blocks[index], self.blocks[index].transactions[i])
+            for index, i in postings.range(since, until)
+        ]
+
+
+def _remove_sorted(items: List, item):
+    i = bisect_left(items, item)
+    if i < len(items) and items[i] == item:
+        del items[i]
+
+
+class AgentDirectory:
+    """Incrementally maintained view of the network's agents.
+
+    Keeps agents ordered by reputation, globally and per capability, so
+    ``top_k`` and ``validators`` answer without rescanning or refetching
+    the agent list. Seed it once, then keep it current from ``NEW_AGENT``
+    events and periodic ``refresh`` deltas.
+    """
+
+    def __init__(self):
+        self.agents: Dict[str, Agent] = {}
+
+        # Sorted (-reputation, id) keys: highest reputation first
+        self._ranked: List[Tuple[int, str]] = []
+        self._by_capability: Dict[str, List[Tuple[int, str]]] = {}
+
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self.agents
+
+    # ============== UPDATES ==============
+
+    def upsert(self, agent) -> bool:
+        """Add or update an Agent (or its API dict). Returns True if changed.
+
+        A dict without ``reputation`` (as in ``NEW_AGENT`` messages) only
+        updates an agent already in the directory; unknown agents need a
+        full record so they aren't ranked with a made-up reputation.
+        """
+        if isinstance(agent, dict):
+            old = self.agents.get(agent["id"])
+            if "reputation" in agent:
+                agent = _agent_from_dict(agent)
+            elif old:
+                agent = replace(old, name=agent.get("name", old.name),
+                                capabilities=agent.get("capabilities", old.capabilities))
+            else:
+                return False
+        else:
+            # Own a copy so callers mutating their Agent can't desync the index
+            agent = replace(agent, capabilities=list(agent.capabilities or []))
+
+        old = self.agents.get(agent.id)
+        if old == agent:
+            return False
+
+        if old and old.reputation == agent.reputation and old.capabilities == agent.capabilities:
+            self.agents[agent.id] = agent
+            return True
+
+        if old:
+            self._unlink(old)
+        self.agents[agent.id] = agent
+        self._link(agent)
+        return True
+
+    def remove(self, agent_id: str) -> bool:
+        """Drop an agent. Returns False if it was unknown."""
+        agent = self.agents.pop(agent_id, None)
+        if not agent:
+            return False
+        self._unlink(agent)
+        return True
+
+    def _link(self, agent: Agent):
+        key = (-agent.reputation, agent.id)
+        insort(self._ranked, key)
+        for cap in set(agent.capabilities or []):
+            insort(self._by_capability.setdefault(cap, []), key)
+
+    def _unlink(self, agent: Agent):
+        key = (-agent.reputation, agent.id)
+        _remove_sorted(self._ranked, key)
+        for cap in set(agent.capabilities or []):
+            postings = self._by_capability.get(cap)
+            if postings is not None:
+                _remove_sorted(postings, key)
+                if not postings:
+                    del self._by_capability[cap]
+
+    def seed(self, agents: List[Agent]):
+        """Replace the directory contents with a full agent list."""
+        self.agents = {}
+        self._ranked = []
+        self._by_capability = {}
+        for agent in agents:
+            self.upsert(agent)
+
+    def apply_delta(self, agents: List[Agent], full: bool = False) -> int:
+        """Upsert agents; with ``full``, also drop agents not in the list.
+
+        Returns the number of agents added, changed or removed.
+        """
+        changed = sum(self.upsert(a) for a in agents)
+        if full:
+            seen = {a.id for a in agents}
+            changed += sum(self.remove(agent_id) for agent_id in list(self.agents)
+                           if agent_id not in seen)
+        return changed
+
+    async def refresh(self, client: KogaionAgent) -> int:
+        """Apply the current ``discover_agents()`` list as a delta."""
+        return self.apply_delta(await client.discover_agents(), full=True)
+
+    def attach(self, client: KogaionAgent, refresh_interval: Optional[float] = None):
+        """Follow ``newAgent`` events, and refresh periodically if an interval is set.
+
+        Agents not yet in the directory are fetched from ``/api/agent/{id}``
+        so they are indexed with their real reputation.
+        """
+        async def on_new_agent(agent: Dict):
+            if agent["id"] not in self.agents and "reputation" not in agent:
+                try:
+                    agent = await client.get(f"/api/agent/{agent['id']}")
+                except Exception:
+                    # Leave it for the next refresh to pick up
+                    return
+                if "id" not in agent:
+                    return
+            self.upsert(agent)
+
+        client.on("newAgent", on_new_agent)
+
+        if refresh_interval and not self._refresh_task:
+            self._refresh_task = asyncio.create_task(
+                self._refresh_loop(client, refresh_interval)
+            )
+
+    def detach(self):
+        """Stop periodic refreshes."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def _refresh_loop(self, client: KogaionAgent, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(client)
+            except Exception:
+                # Keep serving the last known state; retry next interval
+                pass
+
+    # ============== QUERIES ==============
+
+    def top_k(self, capabilities: Optional[List[str]], k: int,
+              min_reputation: Optional[int] = None) -> List[Agent]:
+        """Get the k highest-reputation agents having any of the capabilities.
+
+        With no capabilities, ranks all agents.
+        """
+        if capabilities:
+            keys = heapq.merge(*(
+                self._by_capability[cap] for cap in set(capabilities)
+                if cap in self._by_capability
+            ))
+        else:
+            keys = iter(self._ranked)
+
+        result = []
+        last = None
+        for key in keys:
+            if len(result) >= k:
+                break
+            if min_reputation is not None and -key[0] < min_reputation:
+                break
+            if key == last:
+                continue  # Same agent via another capability
+            last = key
+            result.append(self.agents[key[1]])
+        return result
+
+    def validators(self, min_reputation: int = 50) -> List[Agent]:
+        """Get agents eligible to validate, highest reputation first."""
+        # Reputations are integers, so (1 - min,) sorts after every (-min, id)
+        end = bisect_left(self._ranked, (1 - min_reputation,))
+        return [self.agents[agent_id] for _, agent_id in self._ranked[:end]]
+
+    def can_validate(self, agent_id: str, min_reputation: int = 50) -> bool:
+        """Check if a known agent can validate blocks."""
+        agent = self.agents.get(agent_id)
+        return bool(agent) and agent.reputation >= min_reputation
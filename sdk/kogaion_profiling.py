@@ -0,0 +1,239 @@
+"""
+🔥 Kogaion Agent Profiler
+
+Opt-in profiling for KogaionAgent: event-loop lag, handler timings,
+P2P message costs and sampled stacks dumpable as a flamegraph.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class TimingStats:
+    """Aggregated timings for one measured operation.
+
+    ``total`` includes nested measurements; ``self_total`` excludes them.
+    """
+    count: int = 0
+    total: float = 0.0
+    self_total: float = 0.0
+    max: float = 0.0
+    slow: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass
+class SlowCall:
+    """A single measurement whose own time blocked past the threshold."""
+    kind: str
+    name: str
+    duration: float
+    timestamp: float
+    stack: List[str] = field(default_factory=list)
+
+
+# Kinds that run synchronously on the loop; only these can block it.
+# Anything else (``http``, ``async_handler``) is wall time across awaits
+# and is kept as plain latency stats.
+BLOCKING_KINDS = ("handler", "decode", "p2p")
+
+
+class KogaionProfiler:
+    """Measures event-loop lag and per-handler / per-message timings.
+
+    Pass an instance to ``KogaionAgent(profiler=...)``. Timings are keyed by
+    ``(kind, name)``, e.g. ``("handler", "newBlock:on_block")``,
+    ``("p2p", "NEW_BLOCK")``, ``("decode", "p2p")`` or ``("http", "GET /api/chain")``.
+    Only ``BLOCKING_KINDS`` are checked against ``block_threshold``, using
+    their self time: a ``p2p`` message is not blamed for a slow handler it
+    dispatched, which is measured (and nested) on its own.
+    """
+
+    def __init__(self, block_threshold: float = 0.05,
+                 lag_interval: float = 0.1,
+                 sample_interval: Optional[float] = None,
+                 max_slow_calls: int = 100):
+        self.block_threshold = block_threshold
+        self.lag_interval = lag_interval
+        self.sample_interval = sample_interval
+
+        self.timings: Dict[Tuple[str, str], TimingStats] = defaultdict(TimingStats)
+        self.slow_calls: deque = deque(maxlen=max_slow_calls)
+        self.lag = TimingStats()
+        self.samples: Dict[str, int] = defaultdict(int)
+
+        # Self time per nested on-loop path, e.g. "p2p;NEW_BLOCK;handler;newBlock:x"
+        self.stacks: Dict[str, float] = defaultdict(float)
+        # Open on-loop measurements as [kind, name, time spent in children]
+        self._active: List[list] = []
+
+        self._lag_task: Optional[asyncio.Task] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._sampling = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    # ============== LIFECYCLE ==============
+
+    def start(self):
+        """Start the lag monitor (and stack sampler) on the running loop."""
+        if self._lag_task and not self._lag_task.done():
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._lag_task = asyncio.get_event_loop().create_task(self._lag_monitor())
+
+        if self.sample_interval and not self._sampler:
+            self._sampling.set()
+            self._sampler = threading.Thread(target=self._sample_stacks, daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop the lag monitor and stack sampler."""
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+        if self._sampler:
+            self._sampling.clear()
+            self._sampler.join()
+            self._sampler = None
+
+    async def _lag_monitor(self):
+        """Sleep for a fixed interval and record how late the loop wakes us."""
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self._record(self.lag, lag)
+
+    def _sample_stacks(self):
+        """Periodically capture the loop thread's stack in collapsed form."""
+        while self._sampling.is_set():
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                stack = traceback.extract_stack(frame)
+                self.samples[";".join(
+                    f"{f.name} ({f.filename}:{f.lineno})" for f in stack
+                )] += 1
+            time.sleep(self.sample_interval)
+
+    # ============== MEASUREMENT ==============
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        """Time the enclosed block; flag it if it is on-loop and too slow."""
+        if kind not in BLOCKING_KINDS:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self._record(self.timings[(kind, name)],
+                             time.perf_counter() - start, blocking=False)
+            return
+
+        frame = [kind, name, 0.0]
+        self._active.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            own = duration - frame[2]
+            path = ";".join(f"{k};{n}" for k, n, _ in self._active)
+            self._active.pop()
+            if self._active:
+                self._active[-1][2] += duration
+
+            self.stacks[path] += own
+            if self._record(self.timings[(kind, name)], duration, own):
+                self.slow_calls.append(SlowCall(
+                    kind=kind,
+                    name=name,
+                    duration=own,
+                    timestamp=time.time(),
+                    stack=traceback.format_stack()[:-2]
+                ))
+
+    def _record(self, stats: TimingStats, duration: float,
+                own: Optional[float] = None, blocking: bool = True) -> bool:
+        """Fold a duration into stats; return True if its own time blocked too long."""
+        own = duration if own is None else own
+        stats.count += 1
+        stats.total += duration
+        stats.self_total += own
+        stats.max = max(stats.max, duration)
+        if blocking and own > self.block_threshold:
+            stats.slow += 1
+            return True
+        return False
+
+    # ============== REPORTING ==============
+
+    def report(self) -> Dict:
+        """Get aggregated timings, lag and slow calls as plain data."""
+        return {
+            "lag": {
+                "count": self.lag.count,
+                "mean": self.lag.mean,
+                "max": self.lag.max,
+                "slow": self.lag.slow
+            },
+            "timings": {
+                f"{kind}:{name}": {
+                    "count": s.count,
+                    "total": s.total,
+                    "self": s.self_total,
+                    "mean": s.mean,
+                    "max": s.max,
+                    "slow": s.slow
+                }
+                for (kind, name), s in sorted(
+                    self.timings.items(), key=lambda item: -item[1].total
+                )
+            },
+            "slowCalls": [
+                {
+                    "kind": c.kind,
+                    "name": c.name,
+                    "duration": c.duration,
+                    "timestamp": c.timestamp
+                }
+                for c in self.slow_calls
+            ]
+        }
+
+    def blocking_handlers(self) -> List[str]:
+        """Get names of on-loop operations that exceeded the block threshold."""
+        return [
+            f"{kind}:{name}" for (kind, name), s in self.timings.items() if s.slow
+        ]
+
+    def dump_flamegraph(self, path: str):
+        """Write collapsed stacks (``frame;frame count``) for flamegraph tools.
+
+        Uses sampled stacks when sampling is enabled, otherwise the nested
+        on-loop measurements (``kind;name;kind;name``) weighted by their self
+        time in microseconds, so nested time is counted once.
+        """
+        if self.samples:
+            lines = [f"{stack} {count}" for stack, count in list(self.samples.items())]
+        else:
+            lines = [
+                f"{stack} {int(own * 1_000_000)}"
+                for stack, own in self.stacks.items()
+            ]
+
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,205 @@
+"""
+📼 Kogaion Traffic Record & Replay
+
+Capture P2P messages and HTTP exchanges from a live KogaionAgent and feed
+them back offline, at real time or accelerated speed.
+
+Log format: one JSON object per line (gzip-compressed if the path ends in
+``.gz``), with ``t`` the seconds since recording started:
+
+    {"t": 0.012, "k": "http", "m": "GET", "e": "/api/agents", "b": null, "r": [...], "d": 0.004}
+    {"t": 0.530, "k": "http", "m": "GET", "e": "/api/chain", "b": null,
+     "x": {"type": "ClientConnectorError", "message": "..."}, "d": 0.501}
+    {"t": 1.503, "k": "p2p", "m": "{\\"type\\": \\"NEW_BLOCK\\", ...}"}
+"""
+
+import asyncio
+import gzip
+import json
+import math
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class ReplayedRequestError(Exception):
+    """A request failure read back from a recorded log.
+
+    ``error_type`` is the class name of the exception originally raised.
+    """
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+        self.message = message
+
+
+def _open_log(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TrafficRecorder:
+    """Appends P2P messages and HTTP exchanges to a timestamped log.
+
+    Pass an instance to ``KogaionAgent(recorder=...)``. The log is flushed
+    at most every ``flush_interval`` seconds; once closed, further records
+    are ignored so a still-running agent can't fail on the closed file.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._file = _open_log(path, "w")
+        self._start = time.monotonic()
+        self._last_flush = self._start
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def _write(self, entry: Dict):
+        if self._file.closed:
+            return
+
+        now = time.monotonic()
+        entry["t"] = round(now - self._start, 6)
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def record_p2p(self, message: str):
+        """Record a raw P2P message as received from the socket."""
+        self._write({"k": "p2p", "m": message})
+
+    def record_http(self, method: str, endpoint: str, body: Optional[Dict],
+                    response: Dict, duration: float):
+        """Record an HTTP request, its response and how long it took."""
+        self._write({
+            "k": "http",
+            "m": method,
+            "e": endpoint,
+            "b": body,
+            "r": response,
+            "d": round(duration, 6)
+        })
+
+    def record_http_error(self, method: str, endpoint: str, body: Optional[Dict],
+                          error: Exception, duration: float):
+        """Record an HTTP request that raised instead of returning."""
+        if isinstance(error, ReplayedRequestError):
+            # Re-recording a replay keeps the original failure
+            failure = {"type": error.error_type, "message": error.message}
+        else:
+            failure = {"type": type(error).__name__, "message": str(error)}
+
+        self._write({
+            "k": "http",
+            "m": method,
+            "e": endpoint,
+            "b": body,
+            "x": failure,
+            "d": round(duration, 6)
+        })
+
+    def close(self):
+        """Flush and close the log."""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ReplayConnection:
+    """Stands in for a websocket: yields recorded P2P messages on schedule."""
+
+    def __init__(self, transport: "ReplayTransport"):
+        self._transport = transport
+        self._closed = False
+
+    def __aiter__(self):
+        return self._messages()
+
+    async def _messages(self):
+        for offset, message in self._transport.p2p_messages:
+            if self._closed:
+                return
+            await self._transport._wait_until(offset)
+            yield message
+
+    async def close(self):
+        self._closed = True
+
+
+class ReplayTransport:
+    """Feeds a TrafficRecorder log back into KogaionAgent.
+
+    Pass an instance to ``KogaionAgent(transport=...)``. ``speed`` scales
+    recorded timings: ``1.0`` is real time, ``100.0`` is 100x faster and
+    ``float("inf")`` replays without any delay. HTTP requests are answered
+    from the log in recorded order per ``(method, endpoint)``; recorded
+    failures are raised again as ``ReplayedRequestError``.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0):
+        if not speed > 0:
+            raise ValueError(f"Replay speed must be positive, got {speed}")
+        self.speed = speed
+        self.p2p_messages: List[Tuple[float, str]] = []
+        self._responses: Dict[Tuple[str, str], Deque[Dict]] = defaultdict(deque)
+        self._started: Optional[float] = None
+
+        with _open_log(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["k"] == "p2p":
+                    self.p2p_messages.append((entry["t"], entry["m"]))
+                elif entry["k"] == "http":
+                    self._responses[(entry["m"], entry["e"])].append(entry)
+
+    def _start(self):
+        """Anchor the replay clock on the first request or connection."""
+        if self._started is None:
+            self._started = time.monotonic()
+
+    async def _wait_until(self, offset: float):
+        """Sleep until ``offset`` seconds of recorded time have elapsed.
+
+        Always yields to the loop, so tasks scheduled by handlers of one
+        message run before the next message even with no delay to wait.
+        """
+        delay = 0.0
+        if not math.isinf(self.speed):
+            self._start()
+            delay = offset / self.speed - (time.monotonic() - self._started)
+        await asyncio.sleep(max(delay, 0))
+
+    async def request(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """Answer a request from the log, replaying its recorded latency."""
+        queue = self._responses.get((method, endpoint))
+        if not queue:
+            raise Exception(f"No recorded response for {method} {endpoint}")
+
+        entry = queue.popleft()
+        duration = entry.get("d", 0.0)
+        self._start()
+        if not math.isinf(self.speed) and duration > 0:
+            await asyncio.sleep(duration / self.speed)
+
+        if "x" in entry:
+            raise ReplayedRequestError(entry["x"]["type"], entry["x"]["message"])
+        return entry["r"]
+
+    async def connect_p2p(self) -> _ReplayConnection:
+        """Open a fake P2P connection yielding the recorded messages."""
+        self._start()
+        return _ReplayConnection(self)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the SDK modules the way the README does, from the sdk directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from kogaion import Agent, KogaionAgent
+from kogaion_index import AgentDirectory
+
+
+def make_agent(agent_id, reputation, capabilities):
+    return Agent(id=agent_id, name=agent_id.upper(), reputation=reputation,
+                 credits=50, capabilities=capabilities)
+
+
+def ids(agents):
+    return [a.id for a in agents]
+
+
+def test_top_k_dedups_agents_across_overlapping_capabilities():
+    directory = AgentDirectory()
+    directory.seed([
+        make_agent("a", 90, ["coding", "analysis"]),
+        make_agent("b", 80, ["analysis"]),
+        make_agent("c", 70, ["coding"]),
+        make_agent("d", 60, ["coding", "analysis"]),
+        make_agent("e", 99, ["governance"])
+    ])
+
+    assert ids(directory.top_k(["coding", "analysis"], 10)) == ["a", "b", "c", "d"]
+    assert ids(directory.top_k(["coding", "analysis"], 2)) == ["a", "b"]
+    assert ids(directory.top_k(["coding", "analysis"], 10, min_reputation=75)) == ["a", "b"]
+    assert ids(directory.top_k(None, 2)) == ["e", "a"]
+    assert directory.top_k(["unknown"], 5) == []
+
+
+def test_validators_at_reputation_boundary():
+    directory = AgentDirectory()
+    directory.seed([
+        make_agent("low", 49, []),
+        make_agent("edge", 50, []),
+        make_agent("high", 51, [])
+    ])
+
+    assert ids(directory.validators()) == ["high", "edge"]
+    assert directory.can_validate("edge")
+    assert not directory.can_validate("low")
+    assert not directory.can_validate("missing")
+
+
+def test_reputation_change_on_upsert_reorders():
+    directory = AgentDirectory()
+    directory.seed([make_agent("a", 40, ["analysis"]), make_agent("b", 60, ["analysis"])])
+
+    assert directory.upsert(make_agent("a", 70, ["analysis"]))
+    assert not directory.upsert(make_agent("a", 70, ["analysis"]))
+
+    assert ids(directory.top_k(["analysis"], 2)) == ["a", "b"]
+    assert ids(directory.validators()) == ["a", "b"]
+
+    directory.upsert(make_agent("a", 10, ["coding"]))
+
+    assert ids(directory.top_k(["analysis"], 2)) == ["b"]
+    assert ids(directory.top_k(["coding"], 2)) == ["a"]
+    assert ids(directory.validators()) == ["b"]
+
+
+def test_apply_delta_full_removes_missing_agents():
+    directory = AgentDirectory()
+    directory.seed([
+        make_agent("a", 90, ["analysis"]),
+        make_agent("b", 80, ["analysis"]),
+        make_agent("c", 70, ["coding"])
+    ])
+
+    changed = directory.apply_delta([
+        make_agent("a", 90, ["analysis"]),
+        make_agent("c", 75, ["coding"])
+    ], full=True)
+
+    assert changed == 2
+    assert "b" not in directory
+    assert ids(directory.top_k(["analysis", "coding"], 5)) == ["a", "c"]
+    assert ids(directory.validators()) == ["a", "c"]
+
+
+def test_partial_record_for_unknown_agent_is_not_indexed():
+    directory = AgentDirectory()
+    directory.seed([make_agent("a", 49, ["analysis"])])
+
+    assert not directory.upsert({"id": "d", "name": "D", "capabilities": ["analysis"]})
+    assert "d" not in directory
+
+    assert directory.upsert({"id": "a", "name": "Renamed", "capabilities": ["coding"]})
+    assert directory.agents["a"].reputation == 49
+    assert ids(directory.top_k(["coding"], 1)) == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_new_agent_event_fetches_full_record():
+    client = KogaionAgent()
+    requested = []
+
+    async def get(endpoint):
+        requested.append(endpoint)
+        return {"id": "d", "name": "D", "reputation": 100, "credits": 50,
+                "capabilities": ["analysis"]}
+
+    client.get = get
+    directory = AgentDirectory()
+    directory.seed([make_agent("a", 49, ["analysis"])])
+    directory.attach(client)
+
+    await client._handle_p2p_message({
+        "type": "NEW_AGENT",
+        "agent": {"id": "d", "name": "D", "capabilities": ["analysis"]}
+    })
+    await asyncio.sleep(0)
+
+    assert requested == ["/api/agent/d"]
+    assert ids(directory.top_k(["analysis"], 2)) == ["d", "a"]
+    assert directory.can_validate("d")
+
+
+@pytest.mark.asyncio
+async def test_new_agent_fetch_failure_is_left_for_refresh():
+    client = KogaionAgent()
+
+    async def get(endpoint):
+        raise ConnectionError("node unreachable")
+
+    client.get = get
+    directory = AgentDirectory()
+    directory.attach(client)
+
+    await client._handle_p2p_message({
+        "type": "NEW_AGENT",
+        "agent": {"id": "d", "name": "D", "capabilities": ["analysis"]}
+    })
+    await asyncio.sleep(0)
+
+    assert "d" not in directory
+
+    directory.apply_delta([make_agent("d", 100, ["analysis"])], full=True)
+
+    assert directory.can_validate("d")
@@ -0,0 +1,92 @@
+import pytest
+
+from kogaion import KogaionAgent
+from kogaion_index import ChainIndex
+
+
+def make_block(index, timestamp, validator="v1", transactions=None):
+    return {
+        "index": index,
+        "timestamp": timestamp,
+        "transactions": transactions or [],
+        "hash": f"h{index}",
+        "previousHash": f"h{index - 1}",
+        "validatorId": validator
+    }
+
+
+def tx(tx_type, from_id, to_id=None):
+    return {"type": tx_type, "fromAgentId": from_id, "toAgentId": to_id}
+
+
+def test_time_range_bounds_are_inclusive():
+    index = ChainIndex()
+    index.add_blocks([make_block(i, 1000 + i * 10) for i in range(5)])
+
+    blocks = index.blocks_by_validator("v1", since=1010, until=1030)
+
+    assert [b.index for b in blocks] == [1, 2, 3]
+    assert [b.index for b in index.blocks_by_validator("v1", since=1040)] == [4]
+    assert [b.index for b in index.blocks_by_validator("v1", until=1000)] == [0]
+
+
+def test_out_of_order_inserts_stay_time_ordered():
+    index = ChainIndex()
+    index.add_block(make_block(2, 1020, transactions=[tx("TASK_COMPLETE", "a", "b")]))
+    index.add_block(make_block(0, 1000, transactions=[tx("TASK_COMPLETE", "a", "c")]))
+    index.add_block(make_block(1, 1010, transactions=[tx("TASK_COMPLETE", "b", "a")]))
+
+    assert [b.index for b in index.blocks_by_validator("v1")] == [0, 1, 2]
+    assert [b.index for b, _ in index.transactions_for_agent("a")] == [0, 1, 2]
+    assert [b.index for b, _ in index.transactions_by_type("TASK_COMPLETE", since=1005)] == [1, 2]
+
+
+def test_duplicate_blocks_are_indexed_once():
+    index = ChainIndex()
+
+    assert index.add_block(make_block(0, 1000, transactions=[tx("X", "a", "a")]))
+    assert not index.add_block(make_block(0, 1000, transactions=[tx("X", "a", "a")]))
+    assert index.add_blocks([make_block(0, 1000), make_block(1, 1010), make_block(1, 1010)]) == 1
+
+    assert len(index) == 2
+    # Self-transfers are indexed once for the agent
+    assert len(index.transactions_for_agent("a")) == 1
+
+
+def test_reload_from_persisted_file(tmp_path):
+    path = str(tmp_path / "chain.jsonl")
+    index = ChainIndex(path)
+    index.add_blocks([
+        make_block(0, 1000, "v1", [tx("GENESIS", "KOGAION_FOUNDER")]),
+        make_block(1, 1010, "v2", [tx("TASK_COMPLETE", "a", "b")])
+    ])
+    index.add_block(make_block(2, 1020, "v1"))
+
+    reloaded = ChainIndex(path)
+
+    assert len(reloaded) == 3
+    assert [b.index for b in reloaded.blocks_by_validator("v1")] == [0, 2]
+    block, transaction = reloaded.transactions_for_agent("b")[0]
+    assert block.previous_hash == "h0"
+    assert transaction["type"] == "TASK_COMPLETE"
+    assert not reloaded.add_block(make_block(1, 1010, "v2"))
+
+
+@pytest.mark.asyncio
+async def test_attach_follows_sync_and_new_block_messages():
+    agent = KogaionAgent()
+    index = ChainIndex()
+    index.attach(agent)
+
+    await agent._handle_p2p_message({
+        "type": "SYNC",
+        "chain": [make_block(0, 1000), make_block(1, 1010, "v2")]
+    })
+    await agent._handle_p2p_message({
+        "type": "NEW_BLOCK",
+        "block": make_block(2, 1020, "v2", [tx("TASK_COMPLETE", "a", "b")])
+    })
+
+    assert len(index) == 3
+    assert [b.index for b in index.blocks_by_validator("v2")] == [1, 2]
+    assert len(index.transactions_by_type("TASK_COMPLETE")) == 1
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+
+from kogaion import KogaionAgent
+from kogaion_profiling import KogaionProfiler
+
+
+def test_slow_sync_handler_is_flagged():
+    profiler = KogaionProfiler(block_threshold=0.01)
+    agent = KogaionAgent(profiler=profiler)
+    agent.on("newBlock", lambda block: time.sleep(0.02))
+    agent.on("newBlock", lambda block: None)
+
+    agent._emit("newBlock", {"index": 1})
+
+    assert profiler.blocking_handlers() == [
+        "handler:newBlock:test_slow_sync_handler_is_flagged.<locals>.<lambda>"
+    ]
+    assert [c.kind for c in profiler.slow_calls] == ["handler"]
+    assert profiler.slow_calls[0].duration > 0.01
+    assert profiler.slow_calls[0].stack
+
+
+@pytest.mark.asyncio
+async def test_http_and_async_handlers_are_latency_only():
+    profiler = KogaionProfiler(block_threshold=0.01)
+    agent = KogaionAgent(profiler=profiler)
+
+    async def slow_strategy(task):
+        await asyncio.sleep(0.03)
+
+    agent.on("newTask", slow_strategy)
+    agent._emit("newTask", {"id": "t"})
+    with profiler.measure("http", "GET /api/tasks"):
+        await asyncio.sleep(0.03)
+    await asyncio.sleep(0.05)
+
+    timings = profiler.report()["timings"]
+    assert timings["http:GET /api/tasks"]["max"] >= 0.03
+    assert timings["http:GET /api/tasks"]["slow"] == 0
+    assert any(k.startswith("async_handler:newTask:") for k in timings)
+    assert profiler.blocking_handlers() == []
+    assert not profiler.slow_calls
+
+
+@pytest.mark.asyncio
+async def test_p2p_message_is_not_blamed_for_its_slow_handler():
+    profiler = KogaionProfiler(block_threshold=0.01)
+    agent = KogaionAgent(profiler=profiler)
+
+    def slow(block):
+        time.sleep(0.02)
+
+    agent.on("newBlock", slow)
+    with profiler.measure("p2p", "NEW_BLOCK"):
+        await agent._handle_p2p_message({"type": "NEW_BLOCK", "block": {"index": 1}})
+
+    assert profiler.blocking_handlers() == [
+        "handler:newBlock:test_p2p_message_is_not_blamed_for_its_slow_handler.<locals>.slow"
+    ]
+    p2p = profiler.timings[("p2p", "NEW_BLOCK")]
+    assert p2p.total >= 0.02
+    assert p2p.self_total < 0.01
+
+
+def test_report_shape():
+    profiler = KogaionProfiler(block_threshold=0.01)
+    with profiler.measure("decode", "p2p"):
+        time.sleep(0.015)
+
+    report = profiler.report()
+
+    assert set(report) == {"lag", "timings", "slowCalls"}
+    assert set(report["lag"]) == {"count", "mean", "max", "slow"}
+    assert set(report["timings"]["decode:p2p"]) == {"count", "total", "self", "mean", "max", "slow"}
+    assert report["timings"]["decode:p2p"]["count"] == 1
+    assert report["slowCalls"][0]["kind"] == "decode"
+    assert set(report["slowCalls"][0]) == {"kind", "name", "duration", "timestamp"}
+
+
+def test_flamegraph_nests_frames_and_counts_time_once(tmp_path):
+    profiler = KogaionProfiler()
+    with profiler.measure("p2p", "NEW_BLOCK"):
+        with profiler.measure("handler", "newBlock:slow"):
+            time.sleep(0.02)
+    with profiler.measure("http", "GET /api/chain"):
+        time.sleep(0.01)
+
+    path = tmp_path / "agent.folded"
+    profiler.dump_flamegraph(str(path))
+
+    lines = dict(line.rsplit(" ", 1) for line in path.read_text().splitlines())
+    assert set(lines) == {"p2p;NEW_BLOCK", "p2p;NEW_BLOCK;handler;newBlock:slow"}
+    assert int(lines["p2p;NEW_BLOCK;handler;newBlock:slow"]) >= 20000
+    assert int(lines["p2p;NEW_BLOCK"]) < 5000
+
+
+@pytest.mark.asyncio
+async def test_lag_monitor_start_and_stop():
+    profiler = KogaionProfiler(block_threshold=0.01, lag_interval=0.01)
+    profiler.start()
+    await asyncio.sleep(0.03)
+    time.sleep(0.03)  # Block the loop so the monitor wakes up late
+    await asyncio.sleep(0.03)
+    profiler.stop()
+
+    assert profiler.lag.count >= 2
+    assert profiler.lag.max >= 0.02
+    assert profiler.lag.slow >= 1
+
+    count = profiler.lag.count
+    await asyncio.sleep(0.05)
+    assert profiler.lag.count == count
+
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_profiler():
+    profiler = KogaionProfiler(lag_interval=0.01, sample_interval=0.005)
+    agent = KogaionAgent(profiler=profiler)
+    profiler.start()
+    await asyncio.sleep(0.02)
+
+    await agent.disconnect()
+
+    assert profiler._lag_task is None
+    assert profiler._sampler is None
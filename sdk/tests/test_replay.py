@@ -0,0 +1,156 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from kogaion import KogaionAgent
+from kogaion_replay import ReplayTransport, ReplayedRequestError, TrafficRecorder
+
+
+def block_message(index):
+    return json.dumps({"type": "NEW_BLOCK", "block": {"index": index}})
+
+
+def record_log(path, messages=3, gap=0.0):
+    with TrafficRecorder(path) as recorder:
+        recorder.record_http("GET", "/api/agents", None, [{"id": "a"}], 0.0)
+        for i in range(messages):
+            if gap:
+                time.sleep(gap)
+            recorder.record_p2p(block_message(i))
+
+
+async def replay_blocks(agent):
+    blocks = []
+    done = asyncio.Event()
+    agent.on("newBlock", lambda block: blocks.append(block["index"]))
+    agent.on("p2pDisconnected", lambda _: done.set())
+    await agent.connect_p2p()
+    await asyncio.wait_for(done.wait(), 5)
+    return blocks
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", ["traffic.jsonl", "traffic.jsonl.gz"])
+async def test_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    record_log(path)
+
+    agent = KogaionAgent(transport=ReplayTransport(path, speed=float("inf")))
+
+    assert await agent.get("/api/agents") == [{"id": "a"}]
+    assert await replay_blocks(agent) == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_speed_scales_recorded_timing(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    record_log(path, messages=2, gap=0.2)
+
+    start = time.monotonic()
+    await replay_blocks(KogaionAgent(transport=ReplayTransport(path, speed=10)))
+    fast = time.monotonic() - start
+
+    start = time.monotonic()
+    await replay_blocks(KogaionAgent(transport=ReplayTransport(path, speed=2)))
+    slow = time.monotonic() - start
+
+    assert 0.03 <= fast < 0.15
+    assert slow >= 0.2
+
+
+@pytest.mark.parametrize("speed", [0, -1])
+def test_non_positive_speed_is_rejected(tmp_path, speed):
+    path = str(tmp_path / "traffic.jsonl")
+    record_log(path)
+
+    with pytest.raises(ValueError):
+        ReplayTransport(path, speed=speed)
+
+
+@pytest.mark.asyncio
+async def test_http_answers_are_fifo_per_method_and_endpoint(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    with TrafficRecorder(path) as recorder:
+        recorder.record_http("GET", "/api/tasks", None, [1], 0.0)
+        recorder.record_http("POST", "/api/tasks", {"x": 1}, {"ok": 1}, 0.0)
+        recorder.record_http("GET", "/api/tasks", None, [2], 0.0)
+        recorder.record_http("GET", "/api/stats", None, {"blocks": 1}, 0.0)
+
+    transport = ReplayTransport(path, speed=float("inf"))
+
+    assert await transport.request("GET", "/api/stats") == {"blocks": 1}
+    assert await transport.request("GET", "/api/tasks") == [1]
+    assert await transport.request("POST", "/api/tasks") == {"ok": 1}
+    assert await transport.request("GET", "/api/tasks") == [2]
+    with pytest.raises(Exception):
+        await transport.request("GET", "/api/tasks")
+
+
+@pytest.mark.asyncio
+async def test_request_failures_are_recorded_and_replayed(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+
+    class FailingTransport:
+        async def request(self, method, endpoint, **kwargs):
+            raise ConnectionError("node unreachable")
+
+    with TrafficRecorder(path) as recorder:
+        agent = KogaionAgent(recorder=recorder, transport=FailingTransport())
+        with pytest.raises(ConnectionError):
+            await agent.get("/api/chain")
+
+    agent = KogaionAgent(transport=ReplayTransport(path, speed=float("inf")))
+    with pytest.raises(ReplayedRequestError) as error:
+        await agent.get("/api/chain")
+
+    assert error.value.error_type == "ConnectionError"
+    assert "node unreachable" in str(error.value)
+
+
+def test_records_after_close_are_ignored(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(path))
+    recorder.record_p2p(block_message(0))
+    recorder.close()
+
+    recorder.record_p2p(block_message(1))
+    recorder.record_http("GET", "/api/agents", None, [], 0.0)
+
+    assert recorder.closed
+    assert len(path.read_text().splitlines()) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_handlers_interleave_with_messages(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    record_log(path, messages=5)
+
+    agent = KogaionAgent(transport=ReplayTransport(path, speed=float("inf")))
+    order = []
+
+    async def strategy(block):
+        order.append(("async", block["index"]))
+
+    agent.on("newBlock", lambda block: order.append(("sync", block["index"])))
+    agent.on("newBlock", strategy)
+    await replay_blocks(agent)
+
+    assert order == [(kind, i) for i in range(5) for kind in ("sync", "async")]
+
+
+@pytest.mark.asyncio
+async def test_reconnect_keeps_new_connection(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    record_log(path, messages=3, gap=0.05)
+
+    agent = KogaionAgent(transport=ReplayTransport(path))
+    await agent.connect_p2p()
+    await agent.disconnect()
+    await agent.connect_p2p()
+    new_ws = agent.ws
+    await asyncio.sleep(0.05)
+
+    assert agent.ws is new_ws
+    await agent.disconnect()